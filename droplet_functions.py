@@ -1,7 +1,9 @@
 import cv2
 import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import numpy as np
-import matplotlib.pyplot as plt
 
 """
 @authors: Lyrie Edler and Yehonathan Barda
@@ -9,7 +11,48 @@ import matplotlib.pyplot as plt
 @Copyright (c) 2024 Lyrie Edler and Yehonathan Barda. All rights reserved.
 """
 
-def calculate_contact_angle(image_path, Params_path = False):
+# Image processing objects reused across images. CLAHE objects and the intermediate images keep state
+# between calls, so every thread gets its own to keep calculate_contact_angle safe to call from several threads
+_THREAD_STATE = threading.local()
+_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
+
+def _get_clahe(clip_limit, tile_grid_size=8):
+    # Creating a CLAHE object allocates its per-tile state, so keep one per parameter set (in this thread)
+    cache = getattr(_THREAD_STATE, "clahe", None)
+    if cache is None:
+        cache = _THREAD_STATE.clahe = {}
+    key = (clip_limit, tile_grid_size)
+    if key not in cache:
+        cache[key] = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(tile_grid_size, tile_grid_size))
+    return cache[key]
+
+def _get_buffers(shape):
+    # Intermediate images of the pipeline, reused while consecutive images (in this thread) have the same size
+    buffers = getattr(_THREAD_STATE, "buffers", None)
+    if buffers is None or buffers[0].shape != shape:
+        buffers = _THREAD_STATE.buffers = tuple(np.empty(shape, dtype=np.uint8) for _ in range(5))
+    return buffers
+
+def _detect_edges(image, clahe, threshold1, threshold2):
+    gray, enhanced_gray, blurred, edges, bridged_edges = _get_buffers(image.shape[:2])
+
+    # Step 1: Convert to grayscale
+    cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=gray)
+
+    # Step 2: Enhance contrast
+    clahe.apply(gray, dst=enhanced_gray)
+
+    # Step 3: Gaussian Blur
+    cv2.GaussianBlur(enhanced_gray, (5, 5), 0, dst=blurred)
+
+    # Step 4: Edge Detection
+    cv2.Canny(blurred, threshold1, threshold2, edges=edges)
+
+    # Step 5: Bridge Gaps in Edges
+    cv2.morphologyEx(edges, cv2.MORPH_CLOSE, _KERNEL, dst=bridged_edges, iterations=2)
+    return bridged_edges
+
+def calculate_contact_angle(image_path, Params_path = False, show = True):
     """
     Calculate the contact angle of a droplet in an image.
     This function processes an image to detect a droplet and its contact angle with the surface.
@@ -19,11 +62,14 @@ def calculate_contact_angle(image_path, Params_path = False):
     Parameters:
     image_path (str): The file path to the image containing the droplet.
     Params_path (str): The file path to the parameters file containing the image processing parameters. Optional.
+    show (bool): Whether to display the intermediate results. Set to False for batch processing. Optional.
     Returns:
     float: The contact angle in degrees if the droplet is detected and the angle is calculated successfully.
            None if the droplet is not detected or if there is an error in processing.
+    Raises:
+    ValueError: If the image is not found or has an invalid format.
     Note:
-    - The function displays the intermediate results of the image processing steps. Make sure that drop and surface are detected correctly.
+    - The function displays the intermediate results of the image processing steps (unless show is False). Make sure that drop and surface are detected correctly.
     - Prass q continue to the next image.
     - The contact angle is calculated based on the angle between the droplet and the surface.
 
@@ -36,6 +82,7 @@ def calculate_contact_angle(image_path, Params_path = False):
     HEIGHT_THRESHOLD_FINISH = 5 # Maximum height difference to consider a point
     JUMP_THRESHOLD = 2 # Maximum jump in X to consider a point
     MIN_POINTS_TO_FIND = 4 # Minimum points to consider a line
+    MAX_SIDE = 0 # Downscale larger images to this size (in pixels) before processing, 0 to disable. The pixel thresholds above are not rescaled
 
     You can also pass the path to the parameters file as a second argument to the function.
 
@@ -56,19 +103,19 @@ def calculate_contact_angle(image_path, Params_path = False):
     before running this function, make sure to have the following libraries installed:
     - opencv-python
     - numpy
-    - matplotlib
     - cv2
     - os
     """
 
-    try:
-        # Load the image
-        image = cv2.imread(image_path)
-        if image is None:
-            raise ValueError(f"Error: Image not found or invalid format. Path: {image_path}")
-        else:
-            print(f"Processing image: {image_path}")
+    # Load the image
+    image = cv2.imread(image_path)
+    if image is None:
+        raise ValueError(f"Error: Image not found or invalid format. Path: {image_path}")
+    else:
+        print(f"Processing image: {image_path}")
 
+    droplet_contour = None
+    try:
         # Parameters for image processing
         # Define the default parameters for image processing
         CLIP_LIMIT = 3.0  # Contrast Limited Adaptive Histogram Equalization (CLAHE) clip limit
@@ -79,66 +126,47 @@ def calculate_contact_angle(image_path, Params_path = False):
         HEIGHT_THRESHOLD_FINISH = 5  # Maximum height difference to consider a point
         JUMP_THRESHOLD = 2  # Maximum jump in X to consider a point
         MIN_POINTS_TO_FIND = 4  # Minimum points to consider a line
+        MAX_SIDE = 0  # Downscale larger images to this size (in pixels) before processing, 0 to disable
 
         if Params_path:
             if os.path.exists(Params_path):
                 CLIP_LIMIT, THRESHOLD1, THRESHOLD2, POINTS_TO_TAKE, HEIGHT_THRESHOLD_START, \
-                HEIGHT_THRESHOLD_FINISH, JUMP_THRESHOLD, MIN_POINTS_TO_FIND = load_parameters()
+                HEIGHT_THRESHOLD_FINISH, JUMP_THRESHOLD, MIN_POINTS_TO_FIND, MAX_SIDE = load_parameters(Params_path)
             else:
                 raise ValueError(f"Error: Parameters file not found. Path: {Params_path}\nUsing default parameters or internal parameters.txt file.")
             
         elif os.path.exists("parameters.txt"):  # Check if the file exists
             CLIP_LIMIT, THRESHOLD1, THRESHOLD2, POINTS_TO_TAKE, HEIGHT_THRESHOLD_START, \
-            HEIGHT_THRESHOLD_FINISH, JUMP_THRESHOLD, MIN_POINTS_TO_FIND = load_parameters()
+            HEIGHT_THRESHOLD_FINISH, JUMP_THRESHOLD, MIN_POINTS_TO_FIND, MAX_SIDE = load_parameters()
             print("Using parameters from the parameters.txt file.")
 
+        # Step 0: Optionally downscale large images (off by default, the pixel thresholds are not rescaled)
+        if MAX_SIDE and max(image.shape[:2]) > MAX_SIDE:
+            scale = MAX_SIDE / max(image.shape[:2])
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
 
-
-        # Step 1: Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-        # Step 2: Enhance contrast
-        clahe = cv2.createCLAHE(clipLimit=CLIP_LIMIT, tileGridSize=(8, 8))
-        enhanced_gray = clahe.apply(gray)
-
-        # Step 3: Gaussian Blur
-        blurred = cv2.GaussianBlur(enhanced_gray, (5, 5), 0)
-
-        # Step 4: Edge Detection
-        edges = cv2.Canny(blurred, THRESHOLD1, THRESHOLD2)
-
-        # Step 5: Bridge Gaps in Edges
-        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (5, 5))
-        bridged_edges = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, kernel, iterations=2)
+        # Steps 1-5: Grayscale, contrast enhancement, blur, edge detection and gap bridging
+        bridged_edges = _detect_edges(image, _get_clahe(CLIP_LIMIT), THRESHOLD1, THRESHOLD2)
 
         # Step 6: Find Contours
         contours, _ = cv2.findContours(bridged_edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
 
         # Step 7: Identify the Largest Contour (Droplet)
-        droplet_contour = None
-        max_area = 0
-        for cnt in contours:
-            area = cv2.contourArea(cnt)
-            if area < 500:  # Ignore very small contours
-                continue
-
-            # Check if the contour is in the upper part of the image
-            x, y, w, h = cv2.boundingRect(cnt)
-            if y > gray.shape[0] // 2:
-                continue  # Exclude contours below the midpoint
-
+        areas = np.fromiter((cv2.contourArea(cnt) for cnt in contours), dtype=np.float64, count=len(contours))
+        tops = np.fromiter((cnt[:, 0, 1].min() for cnt in contours), dtype=np.int64, count=len(contours))
+        # Ignore very small contours and exclude contours below the midpoint of the image
+        valid = (areas >= 500) & (tops <= image.shape[0] // 2)
+        if valid.any():
             # Prioritize the largest contour
-            if area > max_area:
-                droplet_contour = cnt
-                max_area = area
+            droplet_contour = contours[int(np.argmax(np.where(valid, areas, -1)))]
 
         if droplet_contour is not None:
-            result = image.copy()
-            cv2.drawContours(result, [droplet_contour], -1, (0, 255, 0), 2)  # Green for droplet
+            # Contour points as an (N, 2) view, with their x and y columns
+            pts = droplet_contour.reshape(-1, 2)
+            xs, ys = pts[:, 0], pts[:, 1]
 
             # Step 8: Find the Highest Point on the Droplet Contour
-            highest_point = tuple(droplet_contour[droplet_contour[:, :, 1].argmin()][0])
-            cv2.circle(result, highest_point, 5, (0, 0, 255), -1)  # Red for highest point
+            highest_point = tuple(pts[ys.argmin()].tolist())
 
             # Step 9: Search for the Surface Start Point
             x_high, y_high = highest_point
@@ -146,19 +174,15 @@ def calculate_contact_angle(image_path, Params_path = False):
             min_distance = 10  # Minimum vertical distance from the highest point
             search_range = 6  # Allow horizontal variation
 
-            points_in_same_x = []
-
             # Lets find all the points close to our x, within search_range
-            for x, y in droplet_contour[:, 0, :].tolist():
-                if (x_high - search_range) < x < (x_high + search_range) and (y > y_high + min_distance):
-                    points_in_same_x.append((x, y))
+            mask = (np.abs(xs - x_high) < search_range) & (ys > y_high + min_distance)
+            candidates = pts[mask]
 
             # Lets Find the closest point to the highest x we can find and draw from that
-            closnes = 999
-            for x, y in points_in_same_x:
-                if abs(x_high - x) <= closnes:
-                    surface_start = (x, y)
-                    closnes = abs(x_high - x)
+            # (on ties the last point along the contour wins, as before)
+            if candidates.size:
+                distances = np.abs(candidates[:, 0] - x_high)[::-1]
+                surface_start = tuple(candidates[len(candidates) - 1 - np.argmin(distances)].tolist())
 
             # Fallback to Bounding Box Bottom if no surface start found
             if surface_start is None:
@@ -166,81 +190,53 @@ def calculate_contact_angle(image_path, Params_path = False):
                 x, y, w, h = cv2.boundingRect(droplet_contour)
                 surface_start = (x, y + h)
 
-            cv2.circle(result, surface_start, 5, (255, 0, 0), -1)  # Blue for surface start point
-
             # Step 10: Define the Surface Line
-            sorted_points = droplet_contour[:, 0, :]
-            sorted_points = sorted_points[sorted_points[:, 0].argsort()]
-            most_right_points = np.array([pt for pt in sorted_points[-POINTS_TO_TAKE:]])
-            most_left_points = np.array([pt for pt in sorted_points[:POINTS_TO_TAKE]])
+            # Only the POINTS_TO_TAKE leftmost and rightmost points are needed, so partition instead of sorting
+            k = min(POINTS_TO_TAKE, len(pts))
+            most_right_points = pts[np.argpartition(xs, len(xs) - k)[len(xs) - k:]]
+            most_left_points = pts[np.argpartition(xs, k - 1)[:k]]
             most_right_point = (int(np.mean(most_right_points[:, 0])), int(np.mean(most_right_points[:, 1])))
             most_left_point = (int(np.mean(most_left_points[:, 0])), int(np.mean(most_left_points[:, 1])))
             surface_points = np.array([most_left_point, surface_start, most_right_point])
             if len(surface_points) < 2:
                 raise ValueError("Insufficient points for surface detection.")
 
-            [vx_d, vy_d, x0_d, y0_d] = cv2.fitLine(surface_points, cv2.DIST_L2, 0, 0.01, 0.01)
+            vx_d, vy_d, x0_d, y0_d = (v.item() for v in cv2.fitLine(surface_points, cv2.DIST_L2, 0, 0.01, 0.01))
 
             # Getting the points of the line so we can compare to them later
             angle_x_range = np.arange(x_high, most_right_point[0], 1)  # Generate x values from 0 to image width
-            angle_y_range = ((vy_d / vx_d) * (angle_x_range - x0_d) + y0_d).astype(int)  # Solve for y = m(x - x0) + y0
-            line_points = np.column_stack((angle_x_range, angle_y_range))
+            angle_y_range = np.rint((vy_d / vx_d) * (angle_x_range - x0_d) + y0_d).astype(np.int32)  # Solve for y = m(x - x0) + y0
 
-            start_index = np.where(sorted_points[:, 0] == surface_start[0])[0][0]
-            tmp_sorted_from_surface_point = sorted_points[start_index:]
+            # Take the points from the surface start point onwards that lie within the line range,
+            # sorting only those by x
+            in_range = (xs >= surface_start[0]) & (xs >= x_high) & (xs < most_right_point[0])
+            seg_pts = pts[in_range]
+            seg_pts = seg_pts[seg_pts[:, 0].argsort()]
+
+            # The line x values are a contiguous range, so the line index of a point is simply x - x_high
+            line_index = seg_pts[:, 0] - x_high
 
             # Now we remove every dot under the line
-            sorted_from_surface_point = []
-            for srt_x, srt_y in tmp_sorted_from_surface_point:
-                try:
-                    index = int(np.where(line_points[:, 0] == srt_x)[0][0])
-                except Exception:
-                    continue
-                if line_points[index][1] < srt_y:
-                    continue
-                sorted_from_surface_point.append((srt_x, srt_y))
+            above_line = angle_y_range[line_index] >= seg_pts[:, 1]
+            seg_pts = seg_pts[above_line]
+            line_index = line_index[above_line]
 
             # Getting the most close points to the line by threshold so we can draw another vector on it
-            tmp_angle_points = []
-            for srt_x, srt_y in sorted_from_surface_point:
-                try:
-                    index = int(np.where(line_points[:, 0] == srt_x)[0][0])
-                except Exception:
-                    continue
-                if not index:
-                    continue
-                if int(line_points[index][1] - srt_y) < HEIGHT_THRESHOLD_FINISH:
-                    continue
-
-                if int(line_points[index][1] - srt_y) > HEIGHT_THRESHOLD_START:
-                    continue
-                tmp_angle_points.append((srt_x, srt_y))
-
-            # Comparing the angle points and filtering out anything going up
-            # Filter all the points going down
-            filtered_angle_points = []
-            filter_start = 0
-            for a_x, a_y in tmp_angle_points:
-                if a_y >= filter_start:
-                    filtered_angle_points.append(np.array([a_x, a_y]))
-                    filter_start = a_y
-                else:
-                    continue
+            height = angle_y_range[line_index] - seg_pts[:, 1]
+            close_to_line = (line_index != 0) & (height >= HEIGHT_THRESHOLD_FINISH) & (height <= HEIGHT_THRESHOLD_START)
+            tmp_angle_points = seg_pts[close_to_line]
 
-            # Now filter if theres and big jumps between points on X line
-            tmp_filtered_angle_points = []
-            prev_point = tmp_angle_points[0][0]
-            for a_x, a_y in tmp_angle_points:
-                if a_x - prev_point > JUMP_THRESHOLD and len(tmp_filtered_angle_points) > MIN_POINTS_TO_FIND:
-                    break
-                else:
-                    tmp_filtered_angle_points.append(np.array([a_x, a_y]))
-                    prev_point = a_x
+            if len(tmp_angle_points) == 0:
+                raise ValueError("Insufficient points for contact angle detection.")
 
-            filtered_angle_points = np.array(tmp_filtered_angle_points)
+            # Now filter if theres and big jumps between points on X line
+            # (cut at the first jump that comes after more than MIN_POINTS_TO_FIND points)
+            jumps = np.flatnonzero(np.diff(tmp_angle_points[:, 0]) > JUMP_THRESHOLD)
+            jumps = jumps[jumps >= MIN_POINTS_TO_FIND]
+            filtered_angle_points = tmp_angle_points[:jumps[0] + 1] if jumps.size else tmp_angle_points
 
             # Now we fit the line for the line of the last angle
-            [fvx_d, fvy_d, fx0_d, fy0_d] = cv2.fitLine(filtered_angle_points, cv2.DIST_L2, 0, 0.01, 0.01)
+            fvx_d, fvy_d, fx0_d, fy0_d = (v.item() for v in cv2.fitLine(filtered_angle_points, cv2.DIST_L2, 0, 0.01, 0.01))
 
             droplet_slope = vy_d / vx_d
 
@@ -249,79 +245,143 @@ def calculate_contact_angle(image_path, Params_path = False):
             magnitude1 = np.sqrt(vx_d**2 + vy_d**2)
             magnitude2 = np.sqrt(fvx_d**2 + fvy_d**2)
             cos_theta = dot_product / (magnitude1 * magnitude2)
-            angle_rad = np.arccos(np.clip(cos_theta, -1.0, 1.0))[0]  # Clip to handle numerical issues
+            angle_rad = np.arccos(np.clip(cos_theta, -1.0, 1.0))  # Clip to handle numerical issues
             angle_deg = np.degrees(angle_rad)
 
             print(f"Angle between the lines: {angle_deg} degrees")
 
-            # Define points for the first line
-            pt1_line1 = (int(x0_d - vx_d * 1000), int(y0_d - vy_d * 1000))
-            pt2_line1 = (int(x0_d + vx_d * 1000), int(y0_d + vy_d * 1000))
-
-            # Define points for the second line
-            pt1_line2 = (int(fx0_d - fvx_d * 1000), int(fy0_d - fvy_d * 1000))
-            pt2_line2 = (int(fx0_d + fvx_d * 1000), int(fy0_d + fvy_d * 1000))
-
-            # Draw the lines
-            cv2.line(result, pt1_line1, pt2_line1, (255, 0, 0), 2)  # Green for the first line
-            cv2.line(result, pt1_line2, pt2_line2, (0, 0, 255), 2)  # Blue for the second line
-
-            # Display the final result
-            plt.figure(figsize=(10, 6))
-            plt.imshow(cv2.cvtColor(result, cv2.COLOR_BGR2RGB))
-            plt.title("Detected Droplet and Surface Lines (Contact Angle: {:.2f}°)".format(angle_deg))
-            plt.axis('off')
-            plt.text(0, -45, "Press q to continue to the next image", color='white', fontsize=12, backgroundcolor='black')
-            plt.show()
+            # Display the final result (the annotated copy is only needed for display)
+            if show:
+                result = image.copy()
+                cv2.drawContours(result, [droplet_contour], -1, (0, 255, 0), 2)  # Green for droplet
+                cv2.circle(result, highest_point, 5, (0, 0, 255), -1)  # Red for highest point
+                cv2.circle(result, surface_start, 5, (255, 0, 0), -1)  # Blue for surface start point
+
+                # Define points for the first line
+                pt1_line1 = (int(x0_d - vx_d * 1000), int(y0_d - vy_d * 1000))
+                pt2_line1 = (int(x0_d + vx_d * 1000), int(y0_d + vy_d * 1000))
+
+                # Define points for the second line
+                pt1_line2 = (int(fx0_d - fvx_d * 1000), int(fy0_d - fvy_d * 1000))
+                pt2_line2 = (int(fx0_d + fvx_d * 1000), int(fy0_d + fvy_d * 1000))
+
+                # Draw the lines
+                cv2.line(result, pt1_line1, pt2_line1, (255, 0, 0), 2)  # Green for the first line
+                cv2.line(result, pt1_line2, pt2_line2, (0, 0, 255), 2)  # Blue for the second line
+
+                show_image(result, "Detected Droplet and Surface Lines (Contact Angle: {:.2f} deg)".format(angle_deg))
             return angle_deg
         else:
             raise ValueError("Droplet not detected. Please review the intermediate results.")
     except Exception as e:
-        error_function(image, str(e), droplet_contour)
+        if show:
+            error_function(image, str(e), droplet_contour)
+        else:
+            print(e)
         return None
 
+def _init_worker():
+    # The images are already processed in parallel, one per worker process, so OpenCV's own threads
+    # would only compete with the other workers. Callers of the serial path keep OpenCV's threading
+    cv2.setNumThreads(1)
+
+def _process_image(image_path, Params_path = False, show = False):
+    # Report unreadable images along with the result instead of raising, so one bad file doesn't stop a batch
+    try:
+        return image_path, calculate_contact_angle(image_path, Params_path, show), None
+    except ValueError as e:
+        return image_path, None, e
+
+def create_executor(max_workers = None):
+    """
+    Create the pool of worker processes calculate_contact_angles processes the images in.
+
+    Parameters:
+    max_workers (int): The number of worker processes. Defaults to ProcessPoolExecutor's default (the number of CPUs, capped on Windows).
+    Returns:
+    ProcessPoolExecutor: The pool, to be shut down by the caller.
+    """
+    # Use spawn rather than fork, OpenCV may hang in forked children
+    context = multiprocessing.get_context("spawn")
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context, initializer=_init_worker)
+
+def calculate_contact_angles(image_paths, Params_path = False, show = False, max_workers = None, ordered = False, executor = None):
+    """
+    Calculate the contact angles of several droplet images.
+    Without display, every image is processed independently by calculate_contact_angle in its own worker process.
+    With display, the images are processed one at a time so each result can be reviewed.
+
+    Parameters:
+    image_paths (list): The file paths to the images containing the droplets.
+    Params_path (str): The file path to the parameters file containing the image processing parameters. Optional.
+    show (bool): Whether to display the intermediate results. Optional.
+    max_workers (int): The number of worker processes. Defaults to ProcessPoolExecutor's default (the number of CPUs, capped on Windows).
+    ordered (bool): Whether to yield the results in the order of image_paths instead of as soon as they are ready. Optional.
+    executor (ProcessPoolExecutor): A pool from create_executor to use instead of a new one (max_workers is ignored then).
+                                    It is left running, so the caller can shut it down, e.g. to cancel the remaining images. Optional.
+    Yields:
+    tuple: (image_path, contact_angle, error) for every image, as soon as it is processed
+           (in the same order as image_paths when show or ordered is True).
+           error is the ValueError for an image that is not found or has an invalid format, None otherwise.
+    """
+    if show:
+        for image_path in image_paths:
+            yield _process_image(image_path, Params_path, show=True)
+        return
+
+    own_executor = executor is None
+    if own_executor:
+        executor = create_executor(max_workers)
+    try:
+        futures = [executor.submit(_process_image, image_path, Params_path) for image_path in image_paths]
+        for future in (futures if ordered else as_completed(futures)):
+            yield future.result()
+    finally:
+        if own_executor:
+            executor.shutdown()
+
 def load_parameters(path = "parameters.txt"):
-    open_file = open(path, "r")
-    lines = open_file.readlines()
-    for line in lines:
-        if "CLIP_LIMIT" in line:
-            CLIP_LIMIT = float(line.split("=")[1].strip())
-        if "THRESHOLD1" in line:
-            THRESHOLD1 = int(line.split("=")[1].strip())
-        if "THRESHOLD2" in line:
-            THRESHOLD2 = int(line.split("=")[1].strip())
-        if "POINTS_TO_TAKE" in line:
-            POINTS_TO_TAKE = int(line.split("=")[1].strip())
-        if "HEIGHT_THRESHOLD_START" in line:
-            HEIGHT_THRESHOLD_START = int(line.split("=")[1].strip())
-        if "HEIGHT_THRESHOLD_FINISH" in line:
-            HEIGHT_THRESHOLD_FINISH = int(line.split("=")[1].strip())
-        if "JUMP_THRESHOLD" in line:
-            JUMP_THRESHOLD = int(line.split("=")[1].strip())
-        if "MIN_POINTS_TO_FIND" in line:
-            MIN_POINTS_TO_FIND = int(line.split("=")[1].strip())
-    open_file.close()
-    return CLIP_LIMIT, THRESHOLD1, THRESHOLD2, POINTS_TO_TAKE, HEIGHT_THRESHOLD_START, HEIGHT_THRESHOLD_FINISH, JUMP_THRESHOLD, MIN_POINTS_TO_FIND
+    # Parse "NAME = value  # comment" lines once, missing values fall back to the defaults
+    with open(path, "r") as open_file:
+        lines = [line.split("#", 1)[0] for line in open_file.read().splitlines()]
+    values = {key.strip(): value.strip() for key, value in (line.split("=", 1) for line in lines if "=" in line)}
+    CLIP_LIMIT = float(values.get("CLIP_LIMIT", 3.0))
+    THRESHOLD1 = int(values.get("THRESHOLD1", 50))
+    THRESHOLD2 = int(values.get("THRESHOLD2", 150))
+    POINTS_TO_TAKE = int(values.get("POINTS_TO_TAKE", 30))
+    HEIGHT_THRESHOLD_START = int(values.get("HEIGHT_THRESHOLD_START", 40))
+    HEIGHT_THRESHOLD_FINISH = int(values.get("HEIGHT_THRESHOLD_FINISH", 5))
+    JUMP_THRESHOLD = int(values.get("JUMP_THRESHOLD", 2))
+    MIN_POINTS_TO_FIND = int(values.get("MIN_POINTS_TO_FIND", 4))
+    MAX_SIDE = int(values.get("MAX_SIDE", 0))
+    return CLIP_LIMIT, THRESHOLD1, THRESHOLD2, POINTS_TO_TAKE, HEIGHT_THRESHOLD_START, HEIGHT_THRESHOLD_FINISH, JUMP_THRESHOLD, MIN_POINTS_TO_FIND, MAX_SIDE
 
 def error_function(result, error_message, contour = None):
     print(error_message)
     # Display the intermediate result
     if contour is not None:
         cv2.drawContours(result, [contour], -1, (0, 255, 0), 2)
-    plt.figure(figsize=(10, 6))
-    plt.imshow(cv2.cvtColor(result, cv2.COLOR_BGR2RGB))
-    plt.title("Error Occurred")
-    plt.axis('off')
-    plt.text(0, -55, "Press q to continue to the next image", color='white', fontsize=12, backgroundcolor='black')
-    plt.text(0, 850, error_message, color='red', fontsize=16, backgroundcolor='white')
-    plt.show()
+    for i, line in enumerate(reversed(error_message.splitlines())):
+        cv2.putText(result, line, (10, result.shape[0] - 15 - 25 * i), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+    show_image(result, "Error Occurred")
+
+def show_image(image, title):
+    # Display the image in an OpenCV window until q is pressed or the window is closed
+    title = f"{title} - Press q to continue to the next image"
+    cv2.namedWindow(title, cv2.WINDOW_NORMAL)
+    cv2.imshow(title, image)
+    while cv2.getWindowProperty(title, cv2.WND_PROP_VISIBLE) >= 1:
+        if cv2.waitKey(100) & 0xFF == ord('q'):
+            break
+    cv2.destroyWindow(title)
 
 if __name__ == "__main__":
     WORKING_FOLDER = '.'
-    ACCEPTED_IMAGE_FORMATS = ['jpeg', 'jpg']
+    ACCEPTED_IMAGE_FORMATS = frozenset({'.jpeg', '.jpg'})
 
-    for file_name in os.listdir(WORKING_FOLDER):
-        if file_name.split('.')[-1] in ACCEPTED_IMAGE_FORMATS:
-            calculate_contact_angle(file_name)
-            print("\n")
+    with os.scandir(WORKING_FOLDER) as entries:
+        image_paths = [entry.path for entry in entries
+                       if entry.is_file() and os.path.splitext(entry.name)[1].lower() in ACCEPTED_IMAGE_FORMATS]
+    for file_name, contact_angle, error in calculate_contact_angles(image_paths):
+        print(error if error else f"File: {file_name}, Contact Angle: {contact_angle} degrees")
 
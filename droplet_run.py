@@ -1,5 +1,5 @@
 import os
-from droplet_functions import calculate_contact_angle
+from droplet_functions import calculate_contact_angles
 
 """
 @authors: Lyrie Edler and Yehonathan Barda
@@ -9,30 +9,38 @@ from droplet_functions import calculate_contact_angle
 This script calculates the contact angle of all the images in the working folder and stores the results in a log file.
 The working folder is defined by the WORKING_FOLDER variable and the accepted image formats are defined by the ACCEPTED_IMAGE_FORMATS variable.
 The results are stored in qthe LOG_FILE file.
+When SHOW_RESULTS is False, the images are processed in parallel without displaying the intermediate results.
 
 """
 
 # Define the working folder and the accepted image formats
 WORKING_FOLDER = '.'
-ACCEPTED_IMAGE_FORMATS = ['jpeg', 'jpg']
+ACCEPTED_IMAGE_FORMATS = frozenset({'.jpeg', '.jpg'})
 PARAMETERS_FILE = False
+SHOW_RESULTS = True
 # Create a log file to store the results
 LOG_FILE = os.path.join(WORKING_FOLDER, 'results.log')
 
-# Open the log file in write mode with UTF-8 encoding
-with open(LOG_FILE, 'w', encoding='utf-8') as log_file:
-    Found_Image = False  # Flag to check if any images were found
+# The guard is needed since the worker processes import this module
+if __name__ == "__main__":
+    with os.scandir(WORKING_FOLDER) as entries:
+        image_paths = [entry.path for entry in entries
+                       if entry.is_file() and os.path.splitext(entry.name)[1].lower() in ACCEPTED_IMAGE_FORMATS]
 
-    for file_name in os.listdir(WORKING_FOLDER):
-        if file_name.split('.')[-1].lower() in ACCEPTED_IMAGE_FORMATS:
-            Found_Image = True
-            file_path = os.path.join(WORKING_FOLDER, file_name)
-            contact_angle = calculate_contact_angle(file_path, PARAMETERS_FILE)
-            log_file.write(f"File: {file_name}, Contact Angle: {contact_angle} degrees\n")
-            print("\n")
+    # The results are written in directory order, they are only written once all images are processed
+    lines = []
+    for file_path, contact_angle, error in calculate_contact_angles(image_paths, PARAMETERS_FILE, show=SHOW_RESULTS, ordered=True):
+        if error is not None:
+            lines.append(f"{error}\n")
+        else:
+            lines.append(f"File: {os.path.basename(file_path)}, Contact Angle: {contact_angle} degrees\n")
 
-    if not Found_Image:
-        log_file.write("No images found in the working folder\n")
+    if not image_paths:
+        lines.append("No images found in the working folder\n")
         print("No images found in the working folder")
     else:
-        print(f"Results stored in the {LOG_FILE} file")
\ No newline at end of file
+        print(f"Results stored in the {LOG_FILE} file")
+
+    # Open the log file in write mode with UTF-8 encoding and write all the results at once
+    with open(LOG_FILE, 'w', encoding='utf-8', buffering=1 << 16) as log_file:
+        log_file.writelines(lines)
@@ -1,11 +1,15 @@
 try:
     import os
     import tkinter as tk
-    from tkinter import filedialog, messagebox
-    from droplet_functions import calculate_contact_angle
+    from tkinter import filedialog, messagebox, ttk
+    from droplet_functions import calculate_contact_angles, create_executor
     from PIL import Image, ImageTk
-    import subprocess
-    import webbrowser
+    import sys
+    import threading
+    import queue
+    import functools
+    import collections
+    import time
     from datetime import datetime
 
 except ImportError as e:
@@ -22,27 +26,73 @@ Droplet Contact Angle Calculation GUI
 @Copyright (c) 2024 Lyrie Edler and Yehonathan Barda. All rights reserved.
 """
 
+@functools.lru_cache(maxsize=8)
+def _load_photo(path, width, height):
+    # Decode and resize each image once, later calls reuse the same PhotoImage
+    image = Image.open(path)
+    image = image.resize((width, height), Image.Resampling.LANCZOS)
+    return ImageTk.PhotoImage(image)
+
+def _is_jpeg(path):
+    # Check the JPEG start of image marker, only the first bytes of the file are read
+    try:
+        with open(path, 'rb') as image_file:
+            return image_file.read(3) == b'\xff\xd8\xff'
+    except OSError:
+        return False
+
+def _open_with_default_app(path):
+    # Let the system open the file with the user's default application
+    try:
+        os.startfile(path)
+    except AttributeError:  # os.startfile only exists on Windows
+        import subprocess
+        subprocess.Popen(['xdg-open', path])
+
+_ANGLE_CACHE_SIZE = 1024
+_HDR_FMT = '%H:%M %d-%m-%Y'  # Time format of the log header
+
+def _parameters_key(parameters_file):
+    # The parameters file calculate_contact_angle reads: the selected one, or parameters.txt when it exists.
+    # None when the selected file is missing, then the results are not cached
+    path = parameters_file or "parameters.txt"
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None if parameters_file else ()
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+def _cache_key(path, parameters_key):
+    # A result stays valid while the image and the parameters file are unchanged, raises OSError if the image is gone
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime_ns, st.st_size) + parameters_key
+
 class DropletApp:
     """
     A GUI application for calculating the contact angle of droplets in images.
     Attributes:
         root (tk.Tk): The root window of the Tkinter application.
         image_files (list): List of selected image file paths.
+        image_basenames (list): The file names of image_files, computed once when the images are selected.
         log_file_name (tk.StringVar): The name of the log file where results will be stored.
         log_directory (tk.StringVar): The directory where the log file will be saved.
-        image_label (tk.Label): Label to display selected image file names.
-        directory_label (tk.Label): Label to display the selected log directory.
-        open_log_button (tk.Button): Button to open the log file after processing.
+        image_label (ttk.Label): Label to display selected image file names.
+        directory_label (ttk.Label): Label to display the selected log directory.
+        open_log_button (ttk.Button): Button to open the log file after processing.
         parameters_file (str): The path of the parameters file.
-        parameters_label (tk.Label): Label to display the selected parameters file.
+        parameters_label (ttk.Label): Label to display the selected parameters file.
         log_mode (tk.StringVar): The mode to open the log file (Write or Append).
+        show_results (tk.BooleanVar): Whether to display the intermediate results. When off, images are processed in parallel.
+        progress_q (queue.Queue): Messages from the processing thread to the Tk thread.
+        progress_label (ttk.Label): Label to display the processing progress.
+        _angle_cache (collections.OrderedDict): Contact angles of already processed images, at most 1024 entries.
 
     Methods:
         create_widgets(): Creates and places the widgets in the application window.
         load_images(): Opens a file dialog to select image files and updates the image label.
         choose_directory(): Opens a directory dialog to select the log directory and updates the directory label.
-        run(): Processes the selected images to calculate contact angles and logs the results.
-        open_log_file(): Opens the log file in Notepad.
+        run(): Starts processing the selected images to calculate contact angles and log the results.
+        open_log_file(): Opens the log file with the default application.
         open_github(): Opens the GitHub repository link in a web browser.
 
     """
@@ -55,77 +105,97 @@ class DropletApp:
         self.root.iconbitmap(icon_path)
 
         self.image_files = []
+        self.image_basenames = []
         self.log_file_name = tk.StringVar(value="results.log")
         self.log_directory = tk.StringVar(value=os.getcwd())
         self.log_mode = tk.StringVar(value="Write")  # Default is write mode
-        self.birthday = "27-2"
-        self.date = datetime.now().strftime('%d-%m')
+        self.show_results = tk.BooleanVar(value=True)
+        self.parameters_file = False
+        self.progress_q = queue.Queue()
+        self.log_file = None
+        self._executor = None  # The worker processes of the running batch, see on_close
+        self._closing = False
+        self._last_log_path = None
+        self._angle_cache = collections.OrderedDict()
+        now = datetime.now()
+        self.birthday = (27, 2)  # (day, month)
+        self.date = (now.day, now.month)
 
         self.create_widgets()
 
-        self.key_sequence = []
+        self.key_sequence = collections.deque(maxlen=10)  # The last 10 keys pressed
+        self._rickroll_code = ('r',) * 5
+        self._konami_code = ('Up', 'Up', 'Down', 'Down', 'Left', 'Right', 'Left', 'Right', 'b', 'a')
         self.root.bind("<KeyPress>", self.unsuspicious_func)
         self.logo_click_count = 0
         self.root.after(1, self.delon_birthday)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
 
 
     def create_widgets(self):
         # Load and resize the logo image
         logo_path = os.path.join(os.path.dirname(__file__), 'icon', 'droplet_icon.png')
-        logo_image = Image.open(logo_path)
-        logo_image = logo_image.resize((90, 90), Image.Resampling.LANCZOS)  # Resize the image to 100x100 pixels
-        logo_photo = ImageTk.PhotoImage(logo_image)
-
-        # Create and place widgets in the application window
-        self.logo_label = tk.Label(self.root, image=logo_photo)
-        self.logo_label.grid(row=0, column=0, columnspan=2, padx=10, pady=10)
+        logo_photo = _load_photo(logo_path, 90, 90)  # Resize the image to 90x90 pixels
         self.root.logo_photo = logo_photo  # Keep a reference to avoid garbage collection
-        self.logo_label.bind("<Button-1>", self.on_logo_click)
-
-        tk.Label(self.root, text="Select Images:").grid(row=1, column=0, padx=10, pady=10)
-        tk.Button(self.root, text="Browse", command=self.load_images).grid(row=1, column=1, padx=10, pady=10)
-        self.image_label = tk.Label(self.root, text="")
-        self.image_label.grid(row=2, column=0, columnspan=2, padx=10, pady=10)
-
-        tk.Label(self.root, text="Log File Name:").grid(row=3, column=0, padx=10, pady=10)
-        tk.Entry(self.root, textvariable=self.log_file_name).grid(row=3, column=1, padx=10, pady=10)
-
-        tk.Label(self.root, text="Log File Directory:").grid(row=4, column=0, padx=10, pady=10)
-        tk.Button(self.root, text="Browse", command=self.choose_directory).grid(row=4, column=1, padx=10, pady=10)
-        self.directory_label = tk.Label(self.root, text=self.log_directory.get())
-        self.directory_label.grid(row=5, column=0, columnspan=2, padx=10, pady=10)
-
-        tk.Label(self.root, text="Log Mode:").grid(row=6, column=0, padx=0, pady=10)
-        tk.Radiobutton(self.root, text="Overwrite", variable=self.log_mode, value="Write").grid(row=6, column=1, padx=1, pady=5, sticky=("w"))
-        tk.Radiobutton(self.root, text="Append", variable=self.log_mode, value="Append").grid(row=6, column=1, padx=1, pady=5)
-
-        tk.Label(self.root, text="Select Parameters file:").grid(row=7, column=0, padx=10, pady=10)
-        tk.Button(self.root, text="Browse", command=self.load_parameters).grid(row=7, column=1, padx=10, pady=10)
-        self.parameters_label = tk.Label(self.root, text="Default")
-        self.parameters_label.grid(row=7, column=0, columnspan=2, padx=10, pady=10)
-        self.open_parameters_button = tk.Button(self.root, text="Open\nParameters", command=self.open_parameters_file, state=tk.DISABLED)
-        self.open_parameters_button.grid(row=8, column=1, columnspan=1, padx=10, pady=10)
-
-
-        tk.Button(self.root, text="Run", command=self.run).grid(row=8, column=0, columnspan=2, padx=10, pady=10)
-        self.open_log_button = tk.Button(self.root, text="Open Log File", command=self.open_log_file, state=tk.DISABLED)
-        self.open_log_button.grid(row=9, column=0, columnspan=2, padx=10, pady=10)
 
+        # One shared style for all the ttk widgets instead of configuring every widget
+        style = ttk.Style(self.root)
+        style.configure('Link.TLabel', foreground="blue", font=("Helvetica", 10, "underline"))
+        style.configure('Small.TLabel', font=("Helvetica", 10))
+
+        # Create the widgets of the application window
+        root = self.root
+        self.logo_label = ttk.Label(root, image=logo_photo)
+        self.image_label = ttk.Label(root, text="")
+        self.directory_label = ttk.Label(root, text=self.log_directory.get())
+        self.parameters_label = ttk.Label(root, text="Default")
+        self.open_parameters_button = ttk.Button(root, text="Open\nParameters", command=self.open_parameters_file, state=tk.DISABLED)
+        self.run_button = ttk.Button(root, text="Run", command=self.run)
+        self.progress_label = ttk.Label(root, text="")
+        self.open_log_button = ttk.Button(root, text="Open Log File", command=self.open_log_file, state=tk.DISABLED)
+        github_link = ttk.Label(root, text="GitHub Repository", style='Link.TLabel', cursor="hand2")
+
+        # Place them with one grid call each: (widget, row, column, columnspan, padx, pady, sticky)
+        layout = [
+            (self.logo_label, 0, 0, 2, 10, 10, ""),
+            (ttk.Label(root, text="Select Images:"), 1, 0, 1, 10, 10, ""),
+            (ttk.Button(root, text="Browse", command=self.load_images), 1, 1, 1, 10, 10, ""),
+            (self.image_label, 2, 0, 2, 10, 10, ""),
+            (ttk.Label(root, text="Log File Name:"), 3, 0, 1, 10, 10, ""),
+            (ttk.Entry(root, textvariable=self.log_file_name), 3, 1, 1, 10, 10, ""),
+            (ttk.Label(root, text="Log File Directory:"), 4, 0, 1, 10, 10, ""),
+            (ttk.Button(root, text="Browse", command=self.choose_directory), 4, 1, 1, 10, 10, ""),
+            (self.directory_label, 5, 0, 2, 10, 10, ""),
+            (ttk.Label(root, text="Log Mode:"), 6, 0, 1, 0, 10, ""),
+            (ttk.Radiobutton(root, text="Overwrite", variable=self.log_mode, value="Write"), 6, 1, 1, 1, 5, "w"),
+            (ttk.Radiobutton(root, text="Append", variable=self.log_mode, value="Append"), 6, 1, 1, 1, 5, ""),
+            (ttk.Label(root, text="Select Parameters file:"), 7, 0, 1, 10, 10, ""),
+            (ttk.Button(root, text="Browse", command=self.load_parameters), 7, 1, 1, 10, 10, ""),
+            (self.parameters_label, 7, 0, 2, 10, 10, ""),
+            (ttk.Label(root, text="Display Results:"), 8, 0, 1, 10, 10, ""),
+            (ttk.Checkbutton(root, text="Show each image", variable=self.show_results), 8, 1, 1, 10, 10, ""),
+            (self.open_parameters_button, 9, 1, 1, 10, 10, ""),
+            (self.run_button, 9, 0, 2, 10, 10, ""),
+            (self.progress_label, 10, 0, 2, 10, 5, ""),
+            (self.open_log_button, 11, 0, 2, 10, 10, ""),
+            # GitHub repository link
+            (github_link, 12, 0, 2, 10, 5, ""),
+            # Copyright information at the bottom
+            (ttk.Label(root, text="Copyright (c) 2024 Lyrie Edler and Yehonathan Barda. All rights reserved.", style='Small.TLabel'), 12, 0, 2, 10, 5, ""),
+        ]
+        for widget, row, column, columnspan, padx, pady, sticky in layout:
+            widget.grid(row=row, column=column, columnspan=columnspan, padx=padx, pady=pady, sticky=sticky)
 
-        # Add GitHub repository link
-        github_link = tk.Label(self.root, text="GitHub Repository", fg="blue", cursor="hand2", font=("Helvetica", 10, "underline"))
-        github_link.grid(row=10, column=0, columnspan=2, padx=10, pady=5)
+        self.logo_label.bind("<Button-1>", self.on_logo_click)
         github_link.bind("<Button-1>", lambda e: self.open_github())
 
-        # Add copyright information at the bottom
-        tk.Label(self.root, text="Copyright (c) 2024 Lyrie Edler and Yehonathan Barda. All rights reserved.", font=("Helvetica", 10)).grid(row=10, column=0, columnspan=2, padx=10, pady=5)
-
     def load_images(self):
         # Open a file dialog to select image files and update the image label
         files = filedialog.askopenfilenames(filetypes=[("Image files", "*.jpeg;*.jpg")])
         if files:
             self.image_files = files
-            self.image_label.config(text="\n".join(os.path.basename(file) for file in files))
+            self.image_basenames = [os.path.basename(file) for file in files]
+            self.image_label.config(text="\n".join(self.image_basenames))
             messagebox.showinfo("Selected Images", f"{len(files)} images selected")
     
     def load_parameters(self):
@@ -152,69 +222,62 @@ class DropletApp:
 
     def animate_Delon_image(self):
         Delon_image_path = os.path.join(os.path.dirname(__file__), 'stuff', 'Delon.png')
-        Delon_image = Image.open(Delon_image_path)
-        Delon_image = Delon_image.resize((80, 220), Image.Resampling.LANCZOS)
-        Delon_photo = ImageTk.PhotoImage(Delon_image)
+        Delon_photo = _load_photo(Delon_image_path, 80, 220)
         self.Delon_label = tk.Label(self.root, image=Delon_photo)
         self.Delon_label.image = Delon_photo
 
-        self.Delon_label.place(x=self.root.winfo_width(), y=0)
-        self.move_Delon_image(self.root.winfo_width(),self.root.winfo_width() -80)
-
-    def move_Delon_image(self, start_x, end_x):
-        step = 5
-        if start_x > end_x:
-            self.Delon_label.place(x=start_x, y=-12)
-            self.root.after(20, self.move_Delon_image, start_x - step, end_x)
-        else:
-            self.root.after(900, self.move_Delon_image_back, end_x, self.root.winfo_width())
-
-    def move_Delon_image_back(self, start_x, end_x):
-        step = 8
-        if start_x < end_x:
-            self.Delon_label.place(x=start_x, y=-12)
-            self.root.after(20, self.move_Delon_image_back, start_x + step, end_x)
+        self.Delon_label.place(x=self.root.winfo_width(), y=-12)
+        self._anim_start = time.perf_counter()
+        self.root.after(20, self.move_Delon_image)
+
+    def move_Delon_image(self):
+        # Slide in at 250 px/s, stay for 0.9 s, then slide back out at 400 px/s.
+        # The position is computed from the elapsed time, so one timer drives the whole animation
+        width = self.root.winfo_width()
+        elapsed = time.perf_counter() - self._anim_start
+        slide_in, stay, slide_out = 80 / 250, 0.9, 80 / 400
+        if elapsed < slide_in:
+            x = width - 250 * elapsed
+        elif elapsed < slide_in + stay:
+            x = width - 80
+        elif elapsed < slide_in + stay + slide_out:
+            x = width - 80 + 400 * (elapsed - slide_in - stay)
         else:
             self.Delon_label.place_forget()
+            return
+        self.Delon_label.place_configure(x=int(x))
+        self.root.after(20, self.move_Delon_image)
     
     def delon_birthday(self):
-        if self.date == self.birthday:
-            self.root.title("Droplet Contact Angle Calculation - Happy Birthday Omry!")
-            Delon_image_path = os.path.join(os.path.dirname(__file__), 'stuff', 'Delon.png')
-            Delon_image = Image.open(Delon_image_path)
-            Delon_image = Delon_image.resize((80, 220), Image.Resampling.LANCZOS)
-            Delon_photo = ImageTk.PhotoImage(Delon_image)
-            self.Delon_label = tk.Label(self.root, image=Delon_photo)
-            self.Delon_label.image = Delon_photo
-            self.Delon_label.place(x=self.root.winfo_width() - 80, y=0-12)
-            birthday_label = tk.Label(self.root, text="Happy Birthday Omry!!!", font=("Helvetica", 24), fg="red")
-            birthday_label.place(relx=0.5, rely=0.4, anchor="center")
+        if self.date != self.birthday:
+            return
+
+        self.root.title("Droplet Contact Angle Calculation - Happy Birthday Omry!")
+        Delon_image_path = os.path.join(os.path.dirname(__file__), 'stuff', 'Delon.png')
+        Delon_photo = _load_photo(Delon_image_path, 80, 220)
+        self.Delon_label = tk.Label(self.root, image=Delon_photo)
+        self.Delon_label.image = Delon_photo
+        self.Delon_label.place(x=self.root.winfo_width() - 80, y=0-12)
+        birthday_label = tk.Label(self.root, text="Happy Birthday Omry!!!", font=("Helvetica", 24), fg="red")
+        birthday_label.place(relx=0.5, rely=0.4, anchor="center")
 
     def unsuspicious_func(self, event):
         self.key_sequence.append(event.keysym)
-        if len(self.key_sequence) > 10:
-            self.key_sequence.pop(0)
-        if self.key_sequence[-5:] == ['r'] * 5:
+        keys = tuple(self.key_sequence)
+        if keys[-5:] == self._rickroll_code:
+                import webbrowser
                 webbrowser.open_new("https://www.youtube.com/watch?v=oHg5SJYRHA0")
 
-        konami_code = ['Up', 'Up', 'Down', 'Down', 'Left', 'Right', 'Left', 'Right', 'b', 'a']
-        if self.key_sequence[-10:] == konami_code:
+        if keys == self._konami_code:
+            import subprocess
             script_path = os.path.join(os.path.dirname(__file__), 'stuff', 'italian_plumber.py')
             try:
-                result = subprocess.run(
-                    ['python', script_path],
-                    check=True,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True
-                )
-                print(result.stdout)  # Print script output if needed
-            except subprocess.CalledProcessError as e:
-                # Display the error in a messagebox
-                messagebox.showerror("Error", f"Sorry, easter egg failed.\nError: {e.stderr}")
+                # Start the game without a console window and without blocking the UI
+                subprocess.Popen([sys.executable, script_path], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                 creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
             except Exception as e:
                 # Handle unexpected exceptions
-                messagebox.showerror("Error", f"Unexpected error occurred.\nError: {e}")
+                messagebox.showerror("Error", f"Sorry, easter egg failed.\nError: {e}")
 
 
     def run(self):
@@ -223,10 +286,8 @@ class DropletApp:
             messagebox.showwarning("No Images", "Please select images to process")
             return
 
-        log_file_path = os.path.join(self.log_directory.get(), self.log_file_name.get())
-        if not log_file_path.endswith('.log'):
-            log_file_path += '.log'
-        
+        log_file_path = self._resolve_log_path()
+
         open_mode = 'a' if self.log_mode.get() == "Append" else 'w'
         if os.path.isfile(log_file_path) and open_mode == 'w':
             result = messagebox.askyesnocancel("File Exists", "Log file already exists. Do you want to overwrite it?\nClick 'No' to append, 'Cancel' to abort.")
@@ -238,46 +299,174 @@ class DropletApp:
         if not os.path.isfile(log_file_path):
             open_mode = 'w'
 
-        with open(log_file_path, open_mode, encoding='utf-8') as log_file:
-            if open_mode == 'w':
-                log_file.write(f"Log started on {datetime.now().strftime('%H:%M %d-%m-%Y')}\n\n")
-
-            for file_name in self.image_files:
+        # The log file is only written from the Tk thread, see _poll_q
+        self.log_file = open(log_file_path, open_mode, encoding='utf-8', buffering=1 << 16)
+        if open_mode == 'w':
+            self.log_file.write(f"Log started on {datetime.now():{_HDR_FMT}}\n\n")
+
+        # Check all the files before processing, so missing or non JPEG files are reported
+        # at once instead of after the images before them were processed.
+        # The file names were computed in load_images, the workers report the full paths
+        image_names, invalid_files = {}, []
+        for file_name, base_name in zip(self.image_files, self.image_basenames):
+            if _is_jpeg(file_name):
+                image_names[file_name] = base_name
+            else:
+                invalid_files.append(file_name)
+        self.log_file.writelines(f"Error: Image not found or invalid format. Path: {file_name}\n" for file_name in invalid_files)
+
+        self.run_button.config(state=tk.DISABLED)
+        self.processed_count = len(invalid_files)
+        self.total_count = len(self.image_files)
+        self.progress_label.config(text=f"Processed {self.processed_count}/{self.total_count} images")
+
+        # Report the invalid files before the processing starts, the first OpenCV window would block the error box
+        if invalid_files:
+            messagebox.showerror("Error", "Image not found or invalid format:\n" + "\n".join(invalid_files))
+
+        if self.show_results.get():
+            # OpenCV windows only work on the main thread, so the displayed images are processed one by one from Tk callbacks
+            results = calculate_contact_angles(list(image_names), self.parameters_file, show=True)
+            self.root.after(1, self._show_next, results, image_names)
+        else:
+            # Process the images in a background thread so the window stays responsive
+            self._executor = create_executor()
+            worker = threading.Thread(target=self._worker, args=(image_names, self.parameters_file, self._executor), daemon=True)
+            worker.start()
+        self.root.after(50, self._poll_q)
+
+    def _show_next(self, results, image_names):
+        # Process and display the next image on the Tk thread, the results go through progress_q like the worker's
+        try:
+            file_name, contact_angle, error = next(results)
+        except StopIteration:
+            self.progress_q.put(('done', None))
+            return
+        except Exception:
+            self.progress_q.put(('done', None))
+            raise
+        if error is not None:
+            self.progress_q.put(('error', f"{error}\n"))
+        else:
+            self._log_result(image_names[file_name], contact_angle)
+        self.root.after(1, self._show_next, results, image_names)
+
+    def _worker(self, image_names, parameters_file, executor):
+        # Runs in the background thread, results are handed to the Tk thread through progress_q
+        try:
+            # Images that were already processed (e.g. Append reruns) are taken from the cache
+            parameters_key = _parameters_key(parameters_file)
+            keys, pending = {}, []
+            for file_name in image_names:
                 try:
-                    # Try to open the image using PIL to check if the file is valid
-                    with Image.open(file_name) as img:
-                        img.verify()  # Verify that it is an image
-                except (IOError, SyntaxError) as e:
-                    log_file.write(f"Error: Image not found or invalid format. Path: {file_name}\n")
-                    messagebox.showerror("Error", f"Image not found or invalid format. Path: {file_name}")
+                    key = None if parameters_key is None else _cache_key(file_name, parameters_key)
+                except OSError:
+                    self.progress_q.put(('error', f"Error: Image not found or invalid format. Path: {file_name}\n"))
                     continue
+                if key in self._angle_cache:
+                    self._angle_cache.move_to_end(key)
+                    self._log_result(image_names[file_name], self._angle_cache[key])
+                else:
+                    keys[file_name] = key
+                    pending.append(file_name)
+
+            for file_name, contact_angle, error in calculate_contact_angles(pending, parameters_file, executor=executor):
+                if error is not None:
+                    self.progress_q.put(('error', f"{error}\n"))
+                    continue
+                self._log_result(image_names[file_name], contact_angle)
+                if contact_angle is not None and keys[file_name] is not None:
+                    self._angle_cache[keys[file_name]] = contact_angle
+                    self._angle_cache.move_to_end(keys[file_name])
+                    if len(self._angle_cache) > _ANGLE_CACHE_SIZE:
+                        self._angle_cache.popitem(last=False)
+        except Exception:
+            # Closing the window shuts the pool down, the remaining images are cancelled (see on_close)
+            if not self._closing:
+                raise
+        finally:
+            executor.shutdown()
+            self.progress_q.put(('done', None))
+
+    def _log_result(self, base_name, contact_angle):
+        self.progress_q.put(('log', f"File: {base_name} | Contact Angle: {contact_angle} degrees\n"))
+
+    def _drain_q(self):
+        # The log lines and errors received so far, and whether the processing is done
+        lines, errors, done = [], [], False
+        try:
+            while True:
+                kind, text = self.progress_q.get_nowait()
+                if kind == 'done':
+                    done = True
+                    break
+                lines.append(text)
+                if kind == 'error':
+                    errors.append(text)
+        except queue.Empty:
+            pass
+        return lines, errors, done
+
+    def _poll_q(self):
+        # Handle the messages from the processing thread, then check again in 50 ms until it is done
+        lines, errors, done = self._drain_q()
+
+        # Write everything received in this round at once
+        self.log_file.writelines(lines)
+        self.processed_count += len(lines)
+        self.progress_label.config(text=f"Processed {self.processed_count}/{self.total_count} images")
+        for text in errors:
+            messagebox.showerror("Error", text.strip())
+
+        if done:
+            self.log_file.close()
+            self._executor = None
+            self._last_log_path = self.log_file.name
+            self.run_button.config(state=tk.NORMAL)
+            messagebox.showinfo("Completed", f"Results stored in {self.log_file.name}")
+            self.open_log_button.config(state=tk.NORMAL)
+        else:
+            self.root.after(50, self._poll_q)
 
-                contact_angle = calculate_contact_angle(file_name,parameters_file=self.parameters_file)
-                log_file.write(f"File: {os.path.basename(file_name)} | Contact Angle: {contact_angle} degrees\n")
-
-        messagebox.showinfo("Completed", f"Results stored in {log_file_path}")
-        self.open_log_button.config(state=tk.NORMAL)
-
-    def open_log_file(self):
-        # Open the log file in Notepad
+    def on_close(self):
+        # Closing the window during a run cancels the images that were not processed yet,
+        # the results received so far are still written to the log
+        if self.log_file is not None and not self.log_file.closed:
+            if not messagebox.askokcancel("Quit", "Images are still being processed. Stop and close?"):
+                return
+            self._closing = True
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self.log_file.writelines(self._drain_q()[0])
+            self.log_file.close()
+        self.root.destroy()
+
+    def _resolve_log_path(self):
+        # The log file path from the chosen directory and name, with the .log extension
         log_file_path = os.path.join(self.log_directory.get(), self.log_file_name.get())
         if not log_file_path.endswith('.log'):
             log_file_path += '.log'
+        return log_file_path
+
+    def open_log_file(self):
+        # Open the log file of the last run, even if the name was edited since
+        log_file_path = self._last_log_path or self._resolve_log_path()
 
         if os.path.isfile(log_file_path):
-            subprocess.Popen(['notepad.exe', log_file_path])
+            _open_with_default_app(log_file_path)
         else:
             messagebox.showerror("Error", "Log file not found")
 
     def open_parameters_file(self):
-        # Open the log file in Notepad
+        # Open the parameters file
 
         if os.path.isfile(self.parameters_file):
-            subprocess.Popen(['notepad.exe', self.parameters_file])
+            _open_with_default_app(self.parameters_file)
         else:
             messagebox.showerror("Error", "Parameters file not found")
     
     def open_github(self):
+        import webbrowser
         webbrowser.open_new("https://github.com/YehonathanBarda/dropletscript")
 
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
 import pygame
+import numpy as np
 import sys
 import os
+from collections import defaultdict, namedtuple
 
 # Initialize pygame
 pygame.init()
@@ -27,16 +29,55 @@ PLAYER_JUMP_HEIGHT = 15  # Increased jump height
 # Gravity
 GRAVITY = 1
 
+# Game states
+PLAYING = 0
+GAME_OVER = 1
+NEXT_LEVEL = 2
+GAME_WON = 3
+
+# Cell size of the obstacle grid used for collision queries
+CELL_SIZE = 128
+
+# The obstacles of a level: their (left, top, right, bottom) bounds and the grid cell -> obstacle indices map
+Obstacles = namedtuple('Obstacles', 'bounds grid')
+
 # Initialize screen
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 pygame.display.set_caption("Italian Plumber Game")
 
+# Load and scale the images once, every sprite of a kind shares the same surface
+PLAYER_IMG = pygame.transform.scale(pygame.image.load(os.path.join("stuff","italian_plumber.png")).convert_alpha(), (PLAYER_WIDTH, PLAYER_HEIGHT))
+MUSHROOM_IMG = pygame.transform.scale(pygame.image.load(os.path.join("stuff","mushroom.png")).convert_alpha(), (30, 30))  # Decreased size
+PRINCESS_IMG = pygame.transform.scale(pygame.image.load(os.path.join("stuff","princess.png")).convert_alpha(), (50, 50))
+
+# Plain colour surfaces shared by all the obstacles and stars
+OBSTACLE_SURF = pygame.Surface((100, 20)).convert()
+OBSTACLE_SURF.fill(RED)
+STAR_SURF = pygame.Surface((20, 20)).convert()
+STAR_SURF.fill(YELLOW)
+
+# Fonts are created once, the title text never changes so it is rendered once too
+HUD_FONT = pygame.font.Font(None, 36)
+MESSAGE_FONT = pygame.font.Font(None, 74)
+TITLE_TEXT = pygame.font.Font(None, 70).render("Italian Plumber Game", True, BLACK)
+TITLE_RECT = TITLE_TEXT.get_rect(topleft=(200, 30))
+
+# The background is drawn once and copied to the screen where sprites have to be erased
+BACKGROUND = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+BACKGROUND.fill(WHITE)
+
+# Draw a list of (surface, position) pairs in one call, Surface.fblits only exists in pygame-ce
+if hasattr(screen, "fblits"):
+    blit_many = screen.fblits
+else:
+    def blit_many(blit_sequence):
+        screen.blits(blit_sequence, doreturn=False)
+
 # Player class
 class Player(pygame.sprite.Sprite):
     def __init__(self):
         super().__init__()
-        self.image = pygame.image.load(os.path.join("stuff","italian_plumber.png")).convert_alpha()
-        self.image = pygame.transform.scale(self.image, (PLAYER_WIDTH, PLAYER_HEIGHT))
+        self.image = PLAYER_IMG
         self.rect = self.image.get_rect()
         self.rect.x = SCREEN_WIDTH // 2
         self.rect.y = SCREEN_HEIGHT - PLAYER_HEIGHT
@@ -46,51 +87,53 @@ class Player(pygame.sprite.Sprite):
         self.jumps = 0
 
     def update(self, obstacles):
-        self.calc_grav()
-        self.rect.x += self.change_x
+        rect = self.rect
+
+        # Gravity
+        if not self.on_ground:
+            self.change_y += GRAVITY
+        else:
+            self.change_y = 0
+
+        # One grid query for the area the player can cover in this frame, both passes test the same candidates
+        swept = rect.union(rect.move(self.change_x, self.change_y))
+        candidates = obstacle_candidates(swept, obstacles)
+
+        rect.x += self.change_x
 
         # Check for collisions with walls
-        if self.rect.right > SCREEN_WIDTH:
-            self.rect.right = SCREEN_WIDTH
-        if self.rect.left < 0:
-            self.rect.left = 0
+        rect.x = max(0, min(rect.x, SCREEN_WIDTH - rect.width))
 
         # Check for collisions with obstacles (horizontal)
-        collision_list = pygame.sprite.spritecollide(self, obstacles, False)
-        for obstacle in collision_list:
+        for left, top, right, bottom in colliding_obstacles(rect, candidates, obstacles):
             if self.change_x > 0:  # Moving right
-                self.rect.right = obstacle.rect.left
+                rect.right = left
             elif self.change_x < 0:  # Moving left
-                self.rect.left = obstacle.rect.right
+                rect.left = right
 
-        self.rect.y += self.change_y
+        rect.y += self.change_y
 
         # Check for collisions with the ground
-        if self.rect.bottom > SCREEN_HEIGHT:
-            self.rect.bottom = SCREEN_HEIGHT
+        if rect.bottom > SCREEN_HEIGHT:
+            rect.bottom = SCREEN_HEIGHT
             self.change_y = 0
             self.on_ground = True
             self.jumps = 0
 
         # Check for collisions with obstacles (vertical)
         self.on_ground = False  # Assume the player is not on the ground
-        collision_list = pygame.sprite.spritecollide(self, obstacles, False)
-        for obstacle in collision_list:
+        if not swept.contains(rect):  # Pushed out of the queried area by an obstacle
+            candidates = obstacle_candidates(rect, obstacles)
+        for left, top, right, bottom in colliding_obstacles(rect, candidates, obstacles):
             if self.change_y > 0:  # Falling down
-                self.rect.bottom = obstacle.rect.top
+                rect.bottom = top
                 self.change_y = 0
                 self.on_ground = True
                 self.jumps = 0
             elif self.change_y < 0:  # Jumping up
-                self.rect.top = obstacle.rect.bottom
+                rect.top = bottom
                 self.change_y = 0
 
-    def calc_grav(self):
-        if not self.on_ground:
-            self.change_y += GRAVITY
-        else:
-            self.change_y = 0
-
     def jump(self):
         if self.on_ground or self.jumps < 2:
             self.change_y = -PLAYER_JUMP_HEIGHT
@@ -110,8 +153,11 @@ class Player(pygame.sprite.Sprite):
 class Obstacle(pygame.sprite.Sprite):
     def __init__(self, x, y, width, height):
         super().__init__()
-        self.image = pygame.Surface((width, height))
-        self.image.fill(RED)
+        if (width, height) == OBSTACLE_SURF.get_size():
+            self.image = OBSTACLE_SURF
+        else:
+            self.image = pygame.Surface((width, height))
+            self.image.fill(RED)
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.y = y
@@ -120,47 +166,93 @@ class Obstacle(pygame.sprite.Sprite):
 class Star(pygame.sprite.Sprite):
     def __init__(self, x, y):
         super().__init__()
-        self.image = pygame.Surface((20, 20))
-        self.image.fill(YELLOW)
+        self.image = STAR_SURF
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.y = y
-        self.change_x = 2  # Speed of the star
-
-    def update(self, *args):
-        self.rect.x += self.change_x
-        if self.rect.right > SCREEN_WIDTH or self.rect.left < 0:
-            self.change_x *= -1  # Reverse direction
+        self.change_x = 2  # Speed of the star, the stars are moved by move_sprites
 
 # Monster class
 class Monster(pygame.sprite.Sprite):
     def __init__(self, x, y, speed=2):
         super().__init__()
-        self.image = pygame.image.load(os.path.join("stuff","mushroom.png")).convert_alpha()
-        self.image = pygame.transform.scale(self.image, (30, 30))  # Decreased size
+        self.image = MUSHROOM_IMG
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.y = y
-        self.change_x = speed  # Speed of the monster
-
-    def update(self, *args):
-        self.rect.x += self.change_x
-        if self.rect.right > SCREEN_WIDTH or self.rect.left < 0:
-            self.change_x *= -1  # Reverse direction
+        self.change_x = speed  # Speed of the monster, the monsters are moved by move_sprites
 
 # Princess class
 class Princess(pygame.sprite.Sprite):
     def __init__(self, x, y):
         super().__init__()
-        self.image = pygame.image.load(os.path.join("stuff","princess.png")).convert_alpha()
-        self.image = pygame.transform.scale(self.image, (50, 50))
+        self.image = PRINCESS_IMG
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.y = y
 
+def grid_cells(left, top, right, bottom):
+    # The (column, row) cells of the obstacle grid covered by a rect
+    for cell_x in range(left // CELL_SIZE, (right - 1) // CELL_SIZE + 1):
+        for cell_y in range(top // CELL_SIZE, (bottom - 1) // CELL_SIZE + 1):
+            yield cell_x, cell_y
+
+def obstacle_candidates(area, obstacles):
+    # Indices of the obstacles in the grid cells covered by area, in level order
+    candidates = set()
+    for cell in grid_cells(area.left, area.top, area.right, area.bottom):
+        candidates.update(obstacles.grid.get(cell, ()))
+    return np.array(sorted(candidates), dtype=np.intp)
+
+def colliding_obstacles(rect, candidates, obstacles):
+    # The [left, top, right, bottom] bounds of the candidate obstacles overlapping rect, they are all tested at once
+    bounds = obstacles.bounds[candidates]
+    hits = (rect.right > bounds[:, 0]) & (rect.left < bounds[:, 2]) & (rect.bottom > bounds[:, 1]) & (rect.top < bounds[:, 3])
+    return bounds[hits].tolist()
+
+def motion_arrays(sprites):
+    # The sprites moving left and right with their positions, sizes and speeds as arrays
+    sprites = list(sprites)
+    x, y, width, height = np.array([sprite.rect for sprite in sprites], dtype=np.int32).reshape(-1, 4).T.copy()
+    change_x = np.array([sprite.change_x for sprite in sprites], dtype=np.int32)
+    return sprites, x, y, width, height, change_x
+
+def move_sprites(motion):
+    # Move all the sprites at once, reversing the direction of the ones that left the screen
+    sprites, x, y, width, height, change_x = motion
+    x += change_x
+    change_x[(x + width > SCREEN_WIDTH) | (x < 0)] *= -1
+    for sprite, sprite_x in zip(sprites, x.tolist()):
+        sprite.rect.x = sprite_x
+
+def colliding_sprites(rect, motion):
+    # Mask of the sprites overlapping rect, they are all tested at once
+    sprites, x, y, width, height, change_x = motion
+    return (rect.right > x) & (rect.left < x + width) & (rect.bottom > y) & (rect.top < y + height)
+
+def remove_sprites(motion, mask):
+    # Kill the masked sprites (e.g. collected stars) and drop them from the arrays
+    sprites, x, y, width, height, change_x = motion
+    for i in np.flatnonzero(mask).tolist():
+        sprites[i].kill()
+    keep = ~mask
+    return [sprite for sprite, kept in zip(sprites, keep.tolist()) if kept], x[keep], y[keep], width[keep], height[keep], change_x[keep]
+
+def hud_text(value, text, color, position):
+    text = HUD_FONT.render(text, True, color)
+    return value, text, text.get_rect(topleft=position)
+
+def redraw_areas(areas, blits):
+    # Redraw each area from the background, then the (surface, rect) pairs overlapping it.
+    # Clipping keeps everything outside the area as it is, so the result matches a full redraw
+    for area in areas:
+        screen.set_clip(area)
+        screen.blit(BACKGROUND, area, area)
+        blit_many([(image, rect) for image, rect in blits if area.colliderect(rect)])
+    screen.set_clip(None)
+
 def display_message(screen, message, color=RED):
-    font = pygame.font.Font(None, 74)
-    text = font.render(message, True, color)
+    text = MESSAGE_FONT.render(message, True, color)
     text_rect = text.get_rect(center=(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2))
     screen.blit(text, text_rect)
     pygame.display.flip()
@@ -219,113 +311,142 @@ def initialize_level(level):
         princess = Princess(750, 250)
         all_sprites.add(princess)
 
-    return all_sprites, obstacles, stars, monsters, princess
+    # The obstacles never move, so their (left, top, right, bottom) bounds are stored once per level
+    # in one int32 block, together with the grid of the cells they cover
+    obs_bounds = np.array([[obstacle.rect.left, obstacle.rect.top, obstacle.rect.right, obstacle.rect.bottom] for obstacle in obstacles], dtype=np.int32).reshape(-1, 4)
+    obstacle_grid = defaultdict(list)
+    for i, bounds in enumerate(obs_bounds.tolist()):
+        for cell in grid_cells(*bounds):
+            obstacle_grid[cell].append(i)
 
-def main(level=1, deaths=0, points=0):
-    # Initialize counters
+    return all_sprites, Obstacles(obs_bounds, obstacle_grid), stars, monsters, princess
 
-    # Create player
-    player = Player()
-    all_sprites, obstacles, stars, monsters, princess = initialize_level(level)
-    all_sprites.add(player)
+def main(level=1, deaths=0, points=0):
+    # (value, rendered text, text rect) of the HUD, the text is rendered again only when the value changes
+    points_text = deaths_text = level_text = (None,)
 
+    state = PLAYING
+    start_level = True
     running = True
     clock = pygame.time.Clock()
 
     while running:
+        if start_level:
+            # Create player
+            player = Player()
+            all_sprites, obstacles, stars, monsters, princess = initialize_level(level)
+            all_sprites.add(player)
+            # The rects are moved in place, so the list only changes when sprites are removed
+            blit_list = [(sprite.image, sprite.rect) for sprite in all_sprites]
+            moving_rects = [sprite.rect for sprite in (player, *stars, *monsters)]
+            star_motion, monster_motion = motion_arrays(stars), motion_arrays(monsters)
+            drawn_rects = []  # Where the moving sprites were drawn in the last frame
+            full_update = True  # The first frame of a level replaces the whole screen
+            start_level = False
+
+        if state != PLAYING:
+            # The message stays on the screen until R (restart or next level) or Q is pressed
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+                    break
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_r:
+                        if state == GAME_OVER:
+                            points = 0  # Restart the level with updated deaths count
+                        elif state == NEXT_LEVEL:
+                            level += 1  # Start the next level
+                        else:
+                            level = 1  # Restart the game from level 1
+                        state = PLAYING
+                        start_level = True
+                        break
+                    elif event.key == pygame.K_q:
+                        running = False
+                        break
+            # Nothing changes on the screen while waiting, so check the keys less often and let the CPU rest
+            clock.tick(30)
+            continue
+
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
             elif event.type == pygame.KEYDOWN:
-                if event.key in (pygame.K_LEFT, pygame.K_a):
-                    player.move_left()
-                elif event.key in (pygame.K_RIGHT, pygame.K_d):
-                    player.move_right()
-                elif event.key in (pygame.K_SPACE, pygame.K_w, pygame.K_UP):
+                if event.key in (pygame.K_SPACE, pygame.K_w, pygame.K_UP):
                     player.jump()
-            elif event.type == pygame.KEYUP:
-                if event.key in (pygame.K_LEFT, pygame.K_a) and player.change_x < 0:
-                    player.stop()
-                elif event.key in (pygame.K_RIGHT, pygame.K_d) and player.change_x > 0:
-                    player.stop()
 
-        # Update all sprites
-        all_sprites.update(obstacles)
+        # Move while the arrow keys are held down, read once per frame from the keyboard state
+        keys = pygame.key.get_pressed()
+        if keys[pygame.K_LEFT] or keys[pygame.K_a]:
+            player.move_left()
+        elif keys[pygame.K_RIGHT] or keys[pygame.K_d]:
+            player.move_right()
+        else:
+            player.stop()
+
+        # Update the player, only it collides with the obstacles; the other sprites have no update of their own
+        player.update(obstacles)
+        move_sprites(star_motion)
+        move_sprites(monster_motion)
 
         # Check for collisions with stars
-        stars_collected = pygame.sprite.spritecollide(player, stars, True)
-        if stars_collected:
-            points += len(stars_collected)
-            print(f"Collected {len(stars_collected)} star(s)! Total points: {points}")
+        stars_hit = colliding_sprites(player.rect, star_motion)
+        if stars_hit.any():
+            star_motion = remove_sprites(star_motion, stars_hit)
+            stars_collected = int(stars_hit.sum())
+            points += stars_collected
+            blit_list = [(sprite.image, sprite.rect) for sprite in all_sprites]
+            moving_rects = [sprite.rect for sprite in (player, *stars, *monsters)]
+            print(f"Collected {stars_collected} star(s)! Total points: {points}")
 
         # Check for collisions with monsters
-        if pygame.sprite.spritecollideany(player, monsters):
+        if colliding_sprites(player.rect, monster_motion).any():
             deaths += 1
             print(f"Player touched a monster! Game Over! Total deaths: {deaths}")
             display_message(screen, "Game Over! Press R to Restart", color=BLUE)
-            waiting_for_restart = True
-            while waiting_for_restart:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        pygame.quit()
-                        sys.exit()
-                    elif event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_r:
-                            main(level, deaths)  # Restart the game with updated deaths count
-                        elif event.key == pygame.K_q:
-                            pygame.quit()
-                            sys.exit()
+            state = GAME_OVER
+            continue
 
         # Check for collision with princess
         if pygame.sprite.collide_rect(player, princess):
             if level < 2:
                 display_message(screen, "Level Complete! Press R for Next Level", color=BLUE)
-                waiting_for_next_level = True
-                while waiting_for_next_level:
-                    for event in pygame.event.get():
-                        if event.type == pygame.QUIT:
-                            pygame.quit()
-                            sys.exit()
-                        elif event.type == pygame.KEYDOWN:
-                            if event.key == pygame.K_r:
-                                main(level + 1, deaths, points)  # Start the next level
-                            elif event.key == pygame.K_q:
-                                pygame.quit()
-                                sys.exit()
+                state = NEXT_LEVEL
             else:
                 display_message(screen, "You Win! Press R to Restart", color=BLUE)
-                waiting_for_restart = True
-                while waiting_for_restart:
-                    for event in pygame.event.get():
-                        if event.type == pygame.QUIT:
-                            pygame.quit()
-                            sys.exit()
-                        elif event.type == pygame.KEYDOWN:
-                            if event.key == pygame.K_r:
-                                main(1, deaths, points)  # Restart the game from level 1
-                            elif event.key == pygame.K_q:
-                                pygame.quit()
-                                sys.exit()
-
-        # Draw everything
-        screen.fill(WHITE)
-        all_sprites.draw(screen)
+                state = GAME_WON
+            continue
+
+        # Only the moving sprites, at their old and new positions, and the changed HUD texts need to be redrawn
+        new_rects = [rect.copy() for rect in moving_rects]
+        dirty_rects = drawn_rects + new_rects
+        drawn_rects = new_rects
 
         # Display points, deaths, and level
-        font = pygame.font.Font(None, 36)
-        font2 = pygame.font.Font(None, 70)
-        points_text = font.render(f"Points: {points}", True, GREEN)
-        deaths_text = font.render(f"Deaths: {deaths}", True, RED)
-        level_text = font.render(f"Level: {level}" + "/2", True, BLUE)
-        Title_text = font2.render(f"Italian Plumber Game", True, BLACK)
-
-        screen.blit(points_text, (10, 10))
-        screen.blit(deaths_text, (10, 50))
-        screen.blit(level_text, (10, 90))
-        screen.blit(Title_text, (200, 30))
-
-        # Flip the display
-        pygame.display.flip()
+        if points_text[0] != points:
+            dirty_rects += points_text[2:]  # Where the old text was
+            points_text = hud_text(points, f"Points: {points}", GREEN, (10, 10))
+            dirty_rects.append(points_text[2])
+        if deaths_text[0] != deaths:
+            dirty_rects += deaths_text[2:]
+            deaths_text = hud_text(deaths, f"Deaths: {deaths}", RED, (10, 50))
+            dirty_rects.append(deaths_text[2])
+        if level_text[0] != level:
+            dirty_rects += level_text[2:]
+            level_text = hud_text(level, f"Level: {level}" + "/2", BLUE, (10, 90))
+            dirty_rects.append(level_text[2])
+        texts = [points_text[1:], deaths_text[1:], level_text[1:], (TITLE_TEXT, TITLE_RECT)]
+
+        # Draw everything and update the display
+        if full_update:
+            screen.blit(BACKGROUND, (0, 0))
+            blit_many(blit_list)
+            blit_many(texts)
+            pygame.display.flip()
+            full_update = False
+        else:
+            redraw_areas(dirty_rects, blit_list + texts)
+            pygame.display.update(dirty_rects)
 
         # Cap the frame rate
         clock.tick(60)